@@ -1,63 +1,86 @@
 import argparse
 import csv
 import datetime
-from collections import defaultdict
+import html
+import io
+import mmap
 from dataclasses import dataclass, field
-from typing import List, Optional, Set
+from typing import List, Optional
 
 try:
     from tabulate import tabulate  # type: ignore
 except ImportError:  # pragma: no cover - optional dependency
     tabulate = None
 
+try:
+    import numpy as np  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+try:
+    from numba import njit, prange  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    njit = None
+
+
+# Bit per weekday, matching datetime.date.weekday() (Monday == bit 0).
+# Both full names and the three-letter abbreviations the README uses
+# (e.g. Mon|Wed) are accepted, for day preferences and --day alike.
+_DAY_BITS = {
+    'monday': 1 << 0,
+    'tuesday': 1 << 1,
+    'wednesday': 1 << 2,
+    'thursday': 1 << 3,
+    'friday': 1 << 4,
+    'saturday': 1 << 5,
+    'sunday': 1 << 6,
+}
+_DAY_BITS.update({name[:3]: bit for name, bit in list(_DAY_BITS.items())})
+
 
-day_names = {
-    'monday': 'Monday',
-    'tuesday': 'Tuesday',
-    'wednesday': 'Wednesday',
-    'thursday': 'Thursday',
-    'friday': 'Friday',
-    'saturday': 'Saturday',
-    'sunday': 'Sunday',
+_BOOL_TABLE = {
+    "y": True, "yes": True, "true": True, "1": True,
+    "n": False, "no": False, "false": False, "0": False,
 }
 
 
 def parse_bool(value: str) -> Optional[bool]:
-    if value is None:
-        return None
-    value = value.strip().lower()
     if not value:
         return None
-    if value in {"y", "yes", "true", "1"}:
-        return True
-    if value in {"n", "no", "false", "0"}:
-        return False
-    return None
+    return _BOOL_TABLE.get(value.strip().lower())
 
 
-def parse_days(value: str) -> Set[str]:
+def parse_days(value: str) -> int:
+    """Parse a pipe-separated day list into a weekday bitmask."""
     if not value:
-        return set()
-    days = set()
+        return 0
+    mask = 0
     for part in value.split("|"):
-        d = part.strip().lower()
-        if d:
-            days.add(d)
-    return days
+        mask |= _DAY_BITS.get(part.strip().lower(), 0)
+    return mask
 
 
-@dataclass
+@dataclass(slots=True)
 class Participant:
     name: str
     preferred_school: Optional[bool]
-    preferred_days: Set[str]
+    preferred_days_mask: int
     distance: Optional[float]
     country: Optional[str]
     gender: Optional[str]
     assignments: List["Event"] = field(default_factory=list)
-
-
-@dataclass
+    # Interned ids assigned at load time: country ids index the per-event
+    # count tables (-1 means unknown), gender ids are 0=unknown/1=M/2=F.
+    _country_id: int = -1
+    _gender_id: int = 0
+    # Ordinal of the most recent assignment date (-1 when unassigned);
+    # with events processed in date order it is the only value the 30-day
+    # gap check needs, and keeping it as an int avoids a timedelta
+    # allocation per comparison.
+    _last_ord: int = -1
+
+
+@dataclass(slots=True)
 class Event:
     name: str
     date: datetime.date
@@ -65,108 +88,393 @@ class Event:
     capacity: int
     school_event: Optional[bool]
     assignments: List[Participant] = field(default_factory=list)
+    _ord: int = field(init=False, default=0)
+
+    def __post_init__(self):
+        self._ord = self.date.toordinal()
+
+
+def _col(row: List[str], i: Optional[int]) -> str:
+    if i is None or i >= len(row):
+        return ""
+    return row[i]
+
+
+def _csv_rows(path: str):
+    """Return an iterator of CSV rows, mmap-splitting when no quoting is used.
+
+    A file without a double quote anywhere cannot contain escaped commas or
+    newlines, so its rows are plain byte splits - much faster than the csv
+    module's state machine for multi-MB inputs. Quoted files fall back to
+    csv.reader.
+    """
+    with open(path, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # zero-length file
+            return iter(())
+        with mm:
+            has_quote = mm.find(b'"') != -1
+            data = mm[:]
+    if has_quote:
+        return csv.reader(io.StringIO(data.decode()))
+    return ([field.decode() for field in line.rstrip(b"\r").split(b",")]
+            for line in data.split(b"\n") if line)
 
 
 def read_participants(path: str) -> List[Participant]:
     participants = []
-    with open(path, newline="") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            participant = Participant(
-                name=row.get("name", "").strip(),
-                preferred_school=parse_bool(row.get("preferred_school")),
-                preferred_days=parse_days(row.get("preferred_days", "")),
-                distance=float(row["distance"]) if row.get("distance") else None,
-                country=row.get("country") or None,
-                gender=(row.get("gender") or "").strip().upper() or None,
-            )
-            participants.append(participant)
+    reader = _csv_rows(path)
+    header = next(reader, None)
+    if not header:
+        return participants
+    idx = {name.strip(): i for i, name in enumerate(header)}
+    i_name = idx.get("name")
+    i_school = idx.get("preferred_school")
+    i_days = idx.get("preferred_days")
+    i_dist = idx.get("distance")
+    i_country = idx.get("country")
+    i_gender = idx.get("gender")
+    country_to_id: dict = {}
+    for row in reader:
+        if not row:
+            continue
+        distance = _col(row, i_dist)
+        participant = Participant(
+            name=_col(row, i_name).strip(),
+            preferred_school=parse_bool(_col(row, i_school)),
+            preferred_days_mask=parse_days(_col(row, i_days)),
+            distance=float(distance) if distance else None,
+            country=_col(row, i_country) or None,
+            gender=_col(row, i_gender).strip().upper() or None,
+        )
+        if participant.country:
+            participant._country_id = country_to_id.setdefault(
+                participant.country, len(country_to_id))
+        if participant.gender == "M":
+            participant._gender_id = 1
+        elif participant.gender == "F":
+            participant._gender_id = 2
+        participants.append(participant)
     return participants
 
 
 def read_events(path: str) -> List[Event]:
     events = []
-    with open(path, newline="") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            date = datetime.datetime.fromisoformat(row["date"]).date()
-            event = Event(
-                name=row.get("name", "").strip(),
-                date=date,
-                location=row.get("location", ""),
-                capacity=int(row.get("capacity", 0)),
-                school_event=parse_bool(row.get("school_event")),
-            )
-            events.append(event)
+    reader = _csv_rows(path)
+    header = next(reader, None)
+    if not header:
+        return events
+    idx = {name.strip(): i for i, name in enumerate(header)}
+    i_name = idx.get("name")
+    i_date = idx.get("date")
+    i_location = idx.get("location")
+    i_capacity = idx.get("capacity")
+    i_school = idx.get("school_event")
+    for row in reader:
+        if not row:
+            continue
+        event = Event(
+            name=_col(row, i_name).strip(),
+            date=datetime.date.fromisoformat(_col(row, i_date)),
+            location=_col(row, i_location),
+            capacity=int(_col(row, i_capacity) or 0),
+            school_event=parse_bool(_col(row, i_school)),
+        )
+        events.append(event)
     return events
 
 
-def days_between(d1: datetime.date, d2: datetime.date) -> int:
-    return abs((d1 - d2).days)
+# Signed contribution to the M-F balance, indexed by interned gender id.
+_GENDER_SIGN = (0, 1, -1)
 
 
-def gender_diff(gender_counts: defaultdict, gender: str) -> int:
-    counts = gender_counts.copy()
-    if gender:
-        counts[gender] += 1
-    return abs(counts.get("M", 0) - counts.get("F", 0))
+def num_countries(participants: List[Participant]) -> int:
+    return max((p._country_id for p in participants), default=-1) + 1
 
 
-def candidate_key(participant: Participant, event: Event,
-                   country_counts: defaultdict, gender_counts: defaultdict):
+# Candidate keys are packed into one non-negative int64 so that comparing
+# keys compares the score components lexicographically, most significant
+# first: school(1) | day(1) | distance centiunits(22) | country count(20) |
+# gender imbalance(19). 63 bits total keeps the sign bit clear.
+_GENDER_MAX = (1 << 19) - 1
+_COUNTRY_SHIFT = 19
+_COUNTRY_MAX = (1 << 20) - 1
+_DIST_SHIFT = 39
+_DIST_MAX = (1 << 22) - 1
+_DAY_SHIFT = 61
+_SCHOOL_SHIFT = 62
+_KEY_SENTINEL = (1 << 63) - 1
+
+
+def base_key(participant: Participant, event: Event, event_day_bit: int) -> int:
+    """Packed score components that do not change between seats of an event."""
     school_score = 0
     if participant.preferred_school is not None and event.school_event is not None:
         if participant.preferred_school != event.school_event:
             school_score = 1
-    day = event.date.strftime("%A").lower()
     day_score = 0
-    if participant.preferred_days and day not in participant.preferred_days:
+    if participant.preferred_days_mask and not (participant.preferred_days_mask & event_day_bit):
         day_score = 1
-    distance_score = participant.distance if participant.distance is not None else 0.0
-    country_score = country_counts.get(participant.country, 0)
-    gender_score = gender_diff(gender_counts, participant.gender)
-    return (school_score, day_score, distance_score, country_score, gender_score)
+    distance = participant.distance if participant.distance is not None else 0.0
+    dist_q = min(max(int(distance * 100.0 + 0.5), 0), _DIST_MAX)
+    return (school_score << _SCHOOL_SHIFT) | (day_score << _DAY_SHIFT) | (dist_q << _DIST_SHIFT)
+
+
+def build_soa(participants: List[Participant]):
+    """Column-oriented arrays of the participant attributes used for scoring.
+
+    Returns (pref_school, pref_days_mask, distance, country_id, gender_signs,
+    assign_count, last_ord, num_countries). Unknown values are
+    encoded as -1 (school, country, dates) or 0 (gender sign, mask).
+    """
+    n = len(participants)
+    pref_school = np.empty(n, dtype=np.int8)
+    pref_days_mask = np.empty(n, dtype=np.uint8)
+    distance = np.empty(n, dtype=np.float64)
+    country_id = np.empty(n, dtype=np.int32)
+    gender_signs = np.empty(n, dtype=np.int8)
+    assign_count = np.empty(n, dtype=np.int8)
+    last_ord = np.empty(n, dtype=np.int32)
+    for i, p in enumerate(participants):
+        if p.preferred_school is None:
+            pref_school[i] = -1
+        else:
+            pref_school[i] = 1 if p.preferred_school else 0
+        pref_days_mask[i] = p.preferred_days_mask
+        distance[i] = p.distance if p.distance is not None else 0.0
+        country_id[i] = p._country_id
+        gender_signs[i] = _GENDER_SIGN[p._gender_id]
+        assign_count[i] = len(p.assignments)
+        last_ord[i] = p._last_ord
+    return (pref_school, pref_days_mask, distance, country_id, gender_signs,
+            assign_count, last_ord, num_countries(participants))
+
+
+def _static_keys(pref_school, pref_days_mask, dist_q, event_school, event_day_bit):
+    """Packed school/day/distance key components for one event, vectorized.
+
+    These depend only on (participant, event), so the drivers compute them
+    once per event and the per-seat step only ORs in the dynamic country
+    and gender components.
+    """
+    if event_school == -1:
+        school = np.zeros(len(pref_school), dtype=np.int64)
+    else:
+        school = ((pref_school != -1) & (pref_school != event_school)).astype(np.int64)
+    day = ((pref_days_mask != 0)
+           & ((pref_days_mask & event_day_bit) == 0)).astype(np.int64)
+    return (school << _SCHOOL_SHIFT) | (day << _DAY_SHIFT) | (dist_q << _DIST_SHIFT)
+
+
+_pick_seat = None
+if np is not None and njit is not None:
+    @njit(parallel=True, cache=True)
+    def _pick_seat(static_keys, country_id, gender_signs, eligible,
+                   country_counts, gender_delta):
+        """Return the index of the best eligible participant, or -1.
+
+        static_keys carries the precomputed school/day/distance components;
+        the kernel ORs in the dynamic country and gender components and
+        takes the argmin of the packed int64 keys. eligible is maintained
+        by the driver: computed once per event, cleared per chosen seat.
+        """
+        n = static_keys.shape[0]
+        sentinel = np.int64(_KEY_SENTINEL)
+        keys = np.empty(n, dtype=np.int64)
+        for i in prange(n):
+            if not eligible[i]:
+                keys[i] = sentinel
+                continue
+            country = np.int64(0)
+            if country_id[i] >= 0:
+                country = np.int64(country_counts[country_id[i]])
+                if country > _COUNTRY_MAX:
+                    country = _COUNTRY_MAX
+            gender = np.int64(abs(gender_delta + gender_signs[i]))
+            if gender > _GENDER_MAX:
+                gender = _GENDER_MAX
+            keys[i] = static_keys[i] | (country << _COUNTRY_SHIFT) | gender
+        best = -1
+        best_key = sentinel
+        for i in range(n):
+            if keys[i] < best_key:
+                best_key = keys[i]
+                best = i
+        return best
+
+
+def _assign_numba(participants: List[Participant], events: List[Event]):
+    (pref_school, pref_days_mask, distance, country_id, gender_signs,
+     assign_count, last_ord, n_countries) = build_soa(participants)
+    dist_q = np.clip((distance * 100.0 + 0.5).astype(np.int64), 0, _DIST_MAX)
+    for event in events:
+        country_counts = np.zeros(max(n_countries, 1), dtype=np.int64)
+        gender_delta = 0
+        event_school = -1 if event.school_event is None else int(event.school_event)
+        event_day_bit = 1 << event.date.weekday()
+        event_ord = event._ord
+        static_keys = _static_keys(pref_school, pref_days_mask, dist_q,
+                                   event_school, event_day_bit)
+        eligible = ((assign_count < 2)
+                    & ((last_ord < 0) | (event_ord - last_ord >= 30)))
+        for _ in range(event.capacity):
+            i = _pick_seat(static_keys, country_id, gender_signs, eligible,
+                           country_counts, gender_delta)
+            if i < 0:
+                break
+            chosen = participants[i]
+            event.assignments.append(chosen)
+            chosen.assignments.append(event)
+            chosen._last_ord = event_ord
+            eligible[i] = False
+            assign_count[i] += 1
+            last_ord[i] = event_ord
+            if country_id[i] >= 0:
+                country_counts[country_id[i]] += 1
+            gender_delta += int(gender_signs[i])
+
+
+def _assign_numpy(participants: List[Participant], events: List[Event]):
+    """Vectorized seat selection for when numpy is present but numba is not.
+
+    Same packed-key scheme as the JIT kernel, expressed as whole-array ops
+    plus one argmin per seat instead of N Python-level key computations.
+    """
+    (pref_school, pref_days_mask, distance, country_id, gender_signs,
+     assign_count, last_ord, n_countries) = build_soa(participants)
+    sentinel = np.int64(_KEY_SENTINEL)
+    dist_q = np.clip((distance * 100.0 + 0.5).astype(np.int64), 0, _DIST_MAX)
+    has_country = country_id >= 0
+    country_idx = np.maximum(country_id, 0)
+    for event in events:
+        country_counts = np.zeros(max(n_countries, 1), dtype=np.int64)
+        gender_delta = 0
+        event_school = -1 if event.school_event is None else int(event.school_event)
+        event_day_bit = 1 << event.date.weekday()
+        event_ord = event._ord
+        static_keys = _static_keys(pref_school, pref_days_mask, dist_q,
+                                   event_school, event_day_bit)
+        eligible = ((assign_count < 2)
+                    & ((last_ord < 0) | (event_ord - last_ord >= 30)))
+        for _ in range(event.capacity):
+            country = np.where(has_country,
+                               np.minimum(country_counts[country_idx], _COUNTRY_MAX), 0)
+            gender = np.minimum(np.abs(gender_delta + gender_signs.astype(np.int64)),
+                                _GENDER_MAX)
+            keys = static_keys | (country << _COUNTRY_SHIFT) | gender
+            keys = np.where(eligible, keys, sentinel)
+            i = int(np.argmin(keys))
+            if keys[i] == sentinel:
+                break
+            chosen = participants[i]
+            event.assignments.append(chosen)
+            chosen.assignments.append(event)
+            chosen._last_ord = event_ord
+            eligible[i] = False
+            assign_count[i] += 1
+            last_ord[i] = event_ord
+            if country_id[i] >= 0:
+                country_counts[country_id[i]] += 1
+            gender_delta += int(gender_signs[i])
 
 
 def assign_events(participants: List[Participant], events: List[Event]):
+    # Process events chronologically: it makes the greedy pass respect the
+    # 30-day rule against only the most recent assignment, since any older
+    # one is necessarily further away.
+    events = sorted(events, key=lambda e: e.date)
+    if _pick_seat is not None:
+        _assign_numba(participants, events)
+    elif np is not None:
+        _assign_numpy(participants, events)
+    else:
+        _assign_python(participants, events)
+
+
+def _assign_python(participants: List[Participant], events: List[Event]):
+    n_countries = num_countries(participants)
+    # Participants who hit the two-assignment cap can never come back, so
+    # drop them from the working set instead of re-filtering them per event.
+    active = participants
     for event in events:
-        country_counts = defaultdict(int)
-        gender_counts = defaultdict(int)
+        # Indexed by interned country id; the extra trailing slot is what
+        # id -1 (unknown country) lands on and is never incremented.
+        country_counts = [0] * (n_countries + 1)
+        # Signed M-F difference of the event's assignments so far; the
+        # balance score for a candidate is abs(gender_delta + their sign).
+        gender_delta = 0
+        event_ord = event._ord
+        eligible = [p for p in active
+                    if len(p.assignments) < 2
+                    and (p._last_ord < 0 or event_ord - p._last_ord >= 30)]
+        if not eligible:
+            continue
+        event_day_bit = 1 << event.date.weekday()
+        base_keys = [base_key(p, event, event_day_bit) for p in eligible]
+
+        def full_key(i: int) -> int:
+            p = eligible[i]
+            country = min(country_counts[p._country_id], _COUNTRY_MAX)
+            gender = min(abs(gender_delta + _GENDER_SIGN[p._gender_id]), _GENDER_MAX)
+            return base_keys[i] | (country << _COUNTRY_SHIFT) | gender
+
+        # The gender component moves for every candidate whenever the delta
+        # changes (and can decrease), so cached orderings go stale; take a
+        # fresh min() over the still-unseated candidates each seat instead.
+        # base_keys holds the static part, and scanning alive in participant
+        # order keeps ties resolving the way the original full sort did.
+        alive = list(range(len(eligible)))
         for _ in range(event.capacity):
-            candidates = [p for p in participants
-                          if len(p.assignments) < 2
-                          and all(days_between(event.date, e.date) >= 30 for e in p.assignments)]
-            if not candidates:
+            # Provable floor for this seat: every component is >= 0 and the
+            # gender term abs(gender_delta + sign) cannot go below
+            # abs(gender_delta) - 1, so a candidate reaching the floor is a
+            # global minimum and the scan can stop there. Scanning in
+            # participant order keeps the tie-break identical.
+            floor = abs(gender_delta) - 1 if gender_delta else 0
+            best_pos = -1
+            best_key = _KEY_SENTINEL
+            for pos, i in enumerate(alive):
+                key = full_key(i)
+                if key < best_key:
+                    best_key = key
+                    best_pos = pos
+                    if key <= floor:
+                        break
+            if best_pos < 0:
                 break
-            candidates.sort(key=lambda p: candidate_key(p, event, country_counts, gender_counts))
-            chosen = candidates[0]
+            chosen = eligible[alive.pop(best_pos)]
             event.assignments.append(chosen)
             chosen.assignments.append(event)
-            if chosen.country:
-                country_counts[chosen.country] += 1
-            if chosen.gender:
-                gender_counts[chosen.gender] += 1
+            chosen._last_ord = event_ord
+            if chosen._country_id >= 0:
+                country_counts[chosen._country_id] += 1
+            gender_delta += _GENDER_SIGN[chosen._gender_id]
+        if any(len(p.assignments) >= 2 for p in event.assignments):
+            active = [p for p in active if len(p.assignments) < 2]
 
 
 def output_assignments(events: List[Event], path: Optional[str] = None) -> None:
     if path:
         if path.endswith('.csv'):
+            rows = [[event.name, event.date.isoformat(), event.location, p.name]
+                    for event in events for p in event.assignments]
             with open(path, 'w', newline='') as f:
                 writer = csv.writer(f)
                 writer.writerow(['event', 'date', 'location', 'participant'])
-                for event in events:
-                    for p in event.assignments:
-                        writer.writerow([event.name, event.date.isoformat(), event.location, p.name])
+                writer.writerows(rows)
             return
         if path.endswith('.html'):
+            parts = ['<html><body>\n']
+            for event in events:
+                parts.append(f'<h2>{html.escape(event.name)} ({event.date})'
+                             f' at {html.escape(event.location)}</h2>\n<ul>')
+                for p in event.assignments:
+                    parts.append(f'<li>{html.escape(p.name)}</li>')
+                parts.append('</ul>\n')
+            parts.append('</body></html>')
             with open(path, 'w') as f:
-                f.write('<html><body>\n')
-                for event in events:
-                    f.write(f'<h2>{event.name} ({event.date}) at {event.location}</h2>\n<ul>')
-                    for p in event.assignments:
-                        f.write(f'<li>{p.name}</li>')
-                    f.write('</ul>\n')
-                f.write('</body></html>')
+                f.write(''.join(parts))
             return
 
     for event in events:
@@ -180,16 +488,50 @@ def output_assignments(events: List[Event], path: Optional[str] = None) -> None:
         print()
 
 
+def _filter_numpy(participants: List[Participant], gender, country, day,
+                  school, max_distance) -> List[Participant]:
+    """One boolean-mask pass over column arrays instead of per-row predicates.
+
+    Only the columns for the requested filters are materialized. The day
+    test uses the precomputed weekday masks, so tokens that are not real
+    weekday names do not count as a preference (matching the scoring path).
+    """
+    mask = np.ones(len(participants), dtype=bool)
+    if gender:
+        genders = np.array([(p.gender or "").upper() for p in participants])
+        mask &= genders == gender.upper()
+    if country:
+        countries = np.array([(p.country or "").lower() for p in participants])
+        mask &= countries == country.lower()
+    if day:
+        day_bit = _DAY_BITS.get(day.lower(), 0)
+        days_mask = np.array([p.preferred_days_mask for p in participants],
+                             dtype=np.uint8)
+        mask &= (days_mask == 0) | ((days_mask & day_bit) != 0)
+    if school is not None:
+        pref_school = np.array(
+            [-1 if p.preferred_school is None else int(p.preferred_school)
+             for p in participants], dtype=np.int8)
+        mask &= (pref_school == -1) | (pref_school == int(school))
+    if max_distance is not None:
+        distance = np.array([p.distance if p.distance is not None else np.nan
+                             for p in participants])
+        mask &= ~(distance > max_distance)
+    return [participants[i] for i in np.flatnonzero(mask)]
+
+
 def filter_participants(participants: List[Participant], gender=None, country=None,
                         day=None, school=None, max_distance=None) -> List[Participant]:
-    day = day.lower() if day else None
+    if np is not None:
+        return _filter_numpy(participants, gender, country, day, school, max_distance)
+    day_bit = _DAY_BITS.get(day.lower(), 0) if day else 0
     result = []
     for p in participants:
         if gender and (p.gender or "").upper() != gender.upper():
             continue
         if country and (p.country or "").lower() != country.lower():
             continue
-        if day and p.preferred_days and day not in p.preferred_days:
+        if day and p.preferred_days_mask and not (p.preferred_days_mask & day_bit):
             continue
         if school is not None and p.preferred_school is not None and p.preferred_school != school:
             continue